@@ -0,0 +1,165 @@
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+
+from configs.config import (
+    CONVERSATION_CACHE_SIZE,
+    CONVERSATION_SUMMARY_CHARS,
+    CONVERSATION_TTL,
+)
+
+CONTINUATION_MAX_WORDS = 12
+# Words that carry no request of their own: acknowledgements, fillers and
+# status checks such as "any update?" or "how long will it take?".
+CONTINUATION_WORDS = frozenset("""
+    a about again all alright also and any anything are but can cool could do
+    does done for get got great hello hey hi how i is it it's its just know
+    let long me more much news no now ok okay on please quick quickly should
+    so soon still sure take thank thanks that that's the there this to update
+    updates us waiting we well what when will would yeah yep yes you
+    """.split())
+PURGE_EVERY = 1000
+SUMMARY_SEPARATOR = " | "
+
+
+@dataclass
+class ConversationContext:
+    last_intent: str
+    last_reply: str
+    summary: str = ""
+    turns: int = 0
+    updated_at: float = field(default_factory=time.time)
+
+
+def is_continuation(query: str) -> bool:
+    """
+    A message continues the thread only when it has no content of its own,
+    e.g. an acknowledgement or a status check on the earlier request.
+    """
+    words = re.findall(r"[a-z']+|\d+", query.lower())
+    if not words or len(words) > CONTINUATION_MAX_WORDS:
+        return False
+    return all(word in CONTINUATION_WORDS for word in words)
+
+
+def roll_summary(summary: str, intent: str, query: str) -> str:
+    entry = f"{intent}: {' '.join(query.split())[:120]}"
+    summary = f"{summary}{SUMMARY_SEPARATOR}{entry}" if summary else entry
+    while len(summary) > CONVERSATION_SUMMARY_CHARS and SUMMARY_SEPARATOR in summary:
+        summary = summary.split(SUMMARY_SEPARATOR, 1)[1]
+    return summary[-CONVERSATION_SUMMARY_CHARS:]
+
+
+class ConversationStore:
+    """
+    Per-conversation context bounded by an in-memory LRU and a TTL, with an
+    optional SQLite file so evicted conversations can be recovered.
+    """
+
+    def __init__(
+        self,
+        max_conversations: int = CONVERSATION_CACHE_SIZE,
+        ttl: float = CONVERSATION_TTL,
+        db_path: str | None = None,
+    ):
+        self.max_conversations = max_conversations
+        self.ttl = ttl
+        self._contexts: OrderedDict[str, ConversationContext] = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS conversations ("
+                "conversation_id TEXT PRIMARY KEY, last_intent TEXT, "
+                "last_reply TEXT, summary TEXT, turns INTEGER, updated_at REAL)"
+            )
+            self._db.commit()
+
+    def __len__(self) -> int:
+        return len(self._contexts)
+
+    def _expired(self, context: ConversationContext) -> bool:
+        return time.time() - context.updated_at > self.ttl
+
+    def _remember(self, conversation_id: str, context: ConversationContext) -> None:
+        self._contexts[conversation_id] = context
+        self._contexts.move_to_end(conversation_id)
+        while len(self._contexts) > self.max_conversations:
+            self._contexts.popitem(last=False)
+
+    def _load(self, conversation_id: str) -> ConversationContext | None:
+        row = self._db.execute(
+            "SELECT last_intent, last_reply, summary, turns, updated_at "
+            "FROM conversations WHERE conversation_id = ?",
+            (conversation_id,),
+        ).fetchone()
+        return ConversationContext(*row) if row else None
+
+    def _save(self, conversation_id: str, context: ConversationContext) -> None:
+        self._db.execute(
+            "INSERT OR REPLACE INTO conversations VALUES (?, ?, ?, ?, ?, ?)",
+            (conversation_id, *asdict(context).values()),
+        )
+        self._db.commit()
+
+    def get(self, conversation_id: str) -> ConversationContext | None:
+        with self._lock:
+            context = self._contexts.get(conversation_id)
+            if context is None and self._db is not None:
+                context = self._load(conversation_id)
+            if context is None:
+                return None
+            if self._expired(context):
+                self._contexts.pop(conversation_id, None)
+                if self._db is not None:
+                    self._db.execute(
+                        "DELETE FROM conversations WHERE conversation_id = ?",
+                        (conversation_id,),
+                    )
+                    self._db.commit()
+                return None
+            self._remember(conversation_id, context)
+            return context
+
+    def update(
+        self, conversation_id: str, query: str, intent: str, reply: str
+    ) -> ConversationContext:
+        previous = self.get(conversation_id)
+        context = ConversationContext(
+            last_intent=intent,
+            last_reply=reply,
+            summary=roll_summary(previous.summary if previous else "", intent, query),
+            turns=(previous.turns if previous else 0) + 1,
+        )
+        with self._lock:
+            self._remember(conversation_id, context)
+            if self._db is not None:
+                self._save(conversation_id, context)
+            self._writes += 1
+            purge = self._writes % PURGE_EVERY == 0
+        if purge:
+            self.purge_expired()
+        return context
+
+    def purge_expired(self) -> int:
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            expired = [
+                conversation_id
+                for conversation_id, context in self._contexts.items()
+                if context.updated_at < cutoff
+            ]
+            for conversation_id in expired:
+                del self._contexts[conversation_id]
+            if self._db is not None:
+                cursor = self._db.execute(
+                    "DELETE FROM conversations WHERE updated_at < ?", (cutoff,)
+                )
+                self._db.commit()
+                return max(len(expired), cursor.rowcount)
+        return len(expired)
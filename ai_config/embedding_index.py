@@ -0,0 +1,38 @@
+import json
+
+import numpy as np
+
+
+class EmbeddingIndex:
+    """
+    Sample query embeddings as one normalized float32 matrix with a parallel
+    intent array, so nearest-intent lookup is a single matrix-vector product
+    and one loaded index can be shared by several tenants.
+    """
+
+    def __init__(self, embeddings, intents: list[str]):
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        self.matrix = matrix / norms
+        self.intents = np.asarray(intents)
+
+    @classmethod
+    def load(cls, path: str) -> "EmbeddingIndex":
+        with open(path) as f:
+            samples = json.load(f)
+        return cls(
+            [item["embedding"] for item in samples],
+            [item["intent"] for item in samples],
+        )
+
+    def __len__(self) -> int:
+        return len(self.intents)
+
+    def nearest_intent(self, embedding) -> str:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if not len(self) or not norm:
+            return "general_inquiry"
+        scores = self.matrix @ (vector / norm)
+        return str(self.intents[int(np.argmax(scores))])
@@ -0,0 +1,123 @@
+import atexit
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Iterator
+
+from configs.config import PROFILE_INTERVAL, PROFILE_OUTPUT
+
+_env_profilers: dict[tuple[float, str], "QueryProfiler"] = {}
+_env_lock = threading.Lock()
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return (
+        f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+    )
+
+
+class QueryProfiler:
+    """
+    Samples the stacks of threads inside profiled calls and aggregates them
+    into collapsed-stack lines that flamegraph tools can render.
+    """
+
+    def __init__(
+        self,
+        sample_rate: float,
+        output_path: str = PROFILE_OUTPUT,
+        interval: float = PROFILE_INTERVAL,
+    ):
+        self.sample_rate = sample_rate
+        self.output_path = output_path
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self.calls_seen = 0
+        self.calls_profiled = 0
+        self._active: Counter[int] = Counter()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    @classmethod
+    def from_env(cls) -> "QueryProfiler | None":
+        """
+        Returns the process-wide profiler configured by PYLON_PROFILE_RATE, so
+        every PylonAI shares one set of samples written once at exit.
+        """
+        try:
+            rate = float(os.getenv("PYLON_PROFILE_RATE", "0") or 0)
+        except ValueError as e:
+            print(f"Invalid PYLON_PROFILE_RATE, profiling disabled: {e}")
+            return None
+        if rate <= 0:
+            return None
+        key = (rate, os.getenv("PYLON_PROFILE_OUTPUT") or PROFILE_OUTPUT)
+        with _env_lock:
+            profiler = _env_profilers.get(key)
+            if profiler is None:
+                profiler = cls(*key)
+                atexit.register(profiler.write_collapsed)
+                _env_profilers[key] = profiler
+        return profiler
+
+    def should_sample(self) -> bool:
+        with self._lock:
+            self.calls_seen += 1
+        return random.random() < self.sample_rate
+
+    @contextmanager
+    def profile(self) -> Iterator[None]:
+        ident = threading.get_ident()
+        with self._lock:
+            self._active[ident] += 1
+            self.calls_profiled += 1
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="pylon-profiler", daemon=True
+                )
+                self._thread.start()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._active[ident] -= 1
+                if self._active[ident] <= 0:
+                    del self._active[ident]
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._active:
+                    self._thread = None
+                    return
+                idents = list(self._active)
+            frames = sys._current_frames()
+            samples = []
+            for ident in idents:
+                frame = frames.get(ident)
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                if stack:
+                    samples.append(";".join(reversed(stack)))
+            with self._lock:
+                self.stacks.update(samples)
+
+    def write_collapsed(self, path: str | None = None) -> str | None:
+        path = path or self.output_path
+        with self._lock:
+            stacks = dict(self.stacks)
+        if not stacks:
+            return None
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            for stack, count in sorted(stacks.items()):
+                f.write(f"{stack} {count}\n")
+        return path
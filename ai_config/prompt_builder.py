@@ -0,0 +1,132 @@
+import json
+import re
+from functools import lru_cache
+
+from configs.config import MAX_QUERY_TOKENS, TOKENIZER_ENCODING
+
+try:
+    import tiktoken
+except ImportError:  # tokenizer is optional, fall back to word pieces
+    tiktoken = None
+
+DEFAULT_MACRO = "Thank you for contacting support. How can we help you?"
+TRUNCATION_MARKER = " [...] "
+
+# Static instructions come first so every request shares the same prefix;
+# per-intent text follows. The prefix is far below the provider's 1024-token
+# prompt caching minimum, so today it mainly keeps requests small and uniform.
+SYSTEM_INSTRUCTIONS = (
+    "You are a helpful customer support agent. "
+    "The next message is the customer's query. "
+    "Please write a detailed, helpful, and friendly reply in more than 150 words, "
+    "but less than 200 words, "
+    "expanding on the suggested response if possible. "
+    "Please do not include any other text in your response."
+)
+
+
+def load_macros(macros_path: str) -> dict[str, str]:
+    with open(macros_path) as f:
+        macros = json.load(f)["macros"]
+    return {macro["intent"]: macro["response"] for macro in macros}
+
+
+class Tokenizer:
+    """
+    Counts and truncates text using tiktoken when available, otherwise
+    whitespace-delimited word pieces as an approximation.
+    """
+
+    def __init__(self, encoding_name: str = TOKENIZER_ENCODING):
+        self._encoding = None
+        if tiktoken is not None:
+            try:
+                self._encoding = tiktoken.get_encoding(encoding_name)
+            except Exception as e:
+                print(f"Error loading tokenizer '{encoding_name}': {e}")
+
+    def encode(self, text: str) -> list:
+        if self._encoding is not None:
+            return self._encoding.encode(text)
+        return re.findall(r"\s*\S+", text)
+
+    def decode(self, tokens: list) -> str:
+        if self._encoding is not None:
+            return self._encoding.decode(tokens)
+        return "".join(tokens)
+
+    def count(self, text: str) -> int:
+        return len(self.encode(text))
+
+    def truncate(self, text: str, budget: int) -> str:
+        tokens = self.encode(text)
+        if len(tokens) <= budget:
+            return text
+        # Keep the opening (usually the problem) and the end (usually the ask).
+        head = budget * 2 // 3
+        tail = budget - head
+        return (
+            self.decode(tokens[:head]).rstrip()
+            + TRUNCATION_MARKER
+            + self.decode(tokens[len(tokens) - tail :]).lstrip()
+        )
+
+
+@lru_cache(maxsize=None)
+def get_tokenizer(encoding_name: str = TOKENIZER_ENCODING) -> Tokenizer:
+    # tiktoken fetches the BPE file on first use; offline deployments must
+    # pre-populate TIKTOKEN_CACHE_DIR, so load it once and share it.
+    return Tokenizer(encoding_name)
+
+
+class PromptBuilder:
+    """
+    Builds chat messages with a stable prefix per intent and the customer's
+    text last, trimmed to a token budget.
+    """
+
+    def __init__(
+        self,
+        macros: dict[str, str],
+        max_query_tokens: int = MAX_QUERY_TOKENS,
+        tokenizer: Tokenizer | None = None,
+    ):
+        self.macros = macros
+        self.max_query_tokens = max_query_tokens
+        self.tokenizer = tokenizer or get_tokenizer()
+        self._system_messages: dict[str, dict] = {}
+
+    def macro_for(self, intent: str) -> str:
+        return self.macros.get(intent) or DEFAULT_MACRO
+
+    def system_message(self, intent: str) -> dict:
+        message = self._system_messages.get(intent)
+        if message is None:
+            message = {
+                "role": "system",
+                "content": (
+                    f"{SYSTEM_INSTRUCTIONS}\n\n"
+                    f"The intent is '{intent}'. "
+                    f"Here is a suggested response: '{self.macro_for(intent)}'."
+                ),
+            }
+            # Model-classified intents are free-form text, so only known
+            # intents are memoized.
+            if intent in self.macros:
+                self._system_messages[intent] = message
+        return message
+
+    def build(
+        self, intent: str, user_query: str = "", conversation_summary: str = ""
+    ) -> list[dict]:
+        query = self.tokenizer.truncate(user_query.strip(), self.max_query_tokens)
+        messages = [self.system_message(intent)]
+        if conversation_summary:
+            messages.append(
+                {
+                    "role": "system",
+                    "content": f"Earlier in this conversation: {conversation_summary}",
+                }
+            )
+        messages.append({"role": "user", "content": query or "(no message provided)"})
+        return messages
@@ -1,6 +1,13 @@
 import json
+import time
+from ai_config.conversation_store import ConversationStore, is_continuation
+from ai_config.embedding_index import EmbeddingIndex
+from ai_config.profiling import QueryProfiler
+from ai_config.prompt_builder import PromptBuilder, load_macros
+from ai_config.semantic_cache import SemanticReplyCache, has_identifiers
+from ai_config.usage import TokenUsageLog
 from configs.config import MAX_TOKENS, TEMPERATURE, TOP_P, ENDPOINT, MODEL
-from intercom_integration.send_reply import send_reply
+from intercom_integration.send_reply import send_reply, workspace_client
 from pydantic import BaseModel, Field
 from typing import Literal
 import os
@@ -37,11 +44,16 @@ class ClassificationResponse(BaseModel):
     chain_of_thought: str = Field(..., description="Reasoning for the prediction.")
 
 
-def get_embedding(text: str) -> list:
-    response = client.embeddings.create(input=text, model=MODEL)
+def get_embedding(text: str, model: str = MODEL) -> list:
+    response = client.embeddings.create(input=text, model=model)
     return response.data[0].embedding
 
 
+def get_embeddings(texts: list[str], model: str = MODEL) -> list[list]:
+    response = client.embeddings.create(input=texts, model=model)
+    return [item.embedding for item in sorted(response.data, key=lambda d: d.index)]
+
+
 def precompute_sample_embeddings(sample_path: str, out_path: str):
     with open(sample_path) as f:
         samples = json.load(f)
@@ -60,37 +72,74 @@ class PylonAI:
         self,
         model_config_path: str,
         embedding_path: str = "data/sample_embeddings.json",
+        macros_path: str = "fallback_macros/intercom_macros.json",
+        conversation_db_path: str | None = None,
+        profiler: QueryProfiler | None = None,
+        model: str = MODEL,
+        temperature: float = TEMPERATURE,
+        top_p: float = TOP_P,
+        max_tokens: int = MAX_TOKENS,
+        embedding_model: str = MODEL,
+        intercom_access_token: str | None = None,
+        intercom_admin_id: str | None = None,
+        embedding_index: EmbeddingIndex | None = None,
     ):
         with open(model_config_path) as f:
             self.config = json.load(f)
         self.intents = self.config["intents"]
+        self.model = model
+        self.temperature = temperature
+        self.top_p = top_p
+        self.max_tokens = max_tokens
+        # Must match the model that built the embedding index.
+        self.embedding_model = embedding_model
+        if bool(intercom_access_token) != bool(intercom_admin_id):
+            raise ValueError(
+                "intercom_access_token and intercom_admin_id must be set together"
+            )
+        self.intercom_client = (
+            workspace_client(intercom_access_token) if intercom_access_token else None
+        )
+        self.intercom_admin_id = intercom_admin_id
+        self.macros = load_macros(macros_path)
+        self.prompt_builder = PromptBuilder(self.macros)
+        self.usage = TokenUsageLog()
+        self.conversations = ConversationStore(db_path=conversation_db_path)
+        self.reply_cache = SemanticReplyCache()
+        self.profiler = profiler if profiler is not None else QueryProfiler.from_env()
         self.embedding_path = embedding_path
-        self.sample_embeddings = None
-        if os.path.exists(self.embedding_path):
-            with open(self.embedding_path) as f:
-                self.sample_embeddings = json.load(f)
+        self.embedding_index = embedding_index
+        if self.embedding_index is None and os.path.exists(self.embedding_path):
+            self.embedding_index = EmbeddingIndex.load(self.embedding_path)
 
     def classify_intent(self, query: str) -> str:
-        if self.sample_embeddings:
-            user_emb = np.array(get_embedding(query))
-            best_score = -1
-            best_intent = None
-            for item in self.sample_embeddings:
-                sample_emb = np.array(item["embedding"])
-                score = np.dot(user_emb, sample_emb) / (
-                    np.linalg.norm(user_emb) * np.linalg.norm(sample_emb)
-                )
-                if score > best_score:
-                    best_score = score
-                    best_intent = item["intent"]
-            return best_intent if best_intent is not None else "general_inquiry"
+        return self.classify_with_embedding(query)[0]
+
+    def classify_batch(self, queries: list[str]) -> list[tuple[str, np.ndarray | None]]:
+        if self.embedding_index and queries:
+            try:
+                embeddings = get_embeddings(queries, self.embedding_model)
+            except Exception as e:
+                print(f"Error with batched embeddings: {e}")
+            else:
+                return [
+                    (self.embedding_index.nearest_intent(emb), np.array(emb))
+                    for emb in embeddings
+                ]
+        return [self.classify_with_embedding(query) for query in queries]
+
+    def classify_with_embedding(self, query: str) -> tuple[str, np.ndarray | None]:
+        if self.embedding_index:
+            user_emb = np.array(get_embedding(query, self.embedding_model))
+            return self.embedding_index.nearest_intent(user_emb), user_emb
 
         try:
+            start = time.perf_counter()
             response = client.chat.completions.create(
-                model=MODEL,
-                temperature=TEMPERATURE,
-                top_p=TOP_P,
-                max_tokens=MAX_TOKENS,
+                model=self.model,
+                temperature=self.temperature,
+                top_p=self.top_p,
+                max_tokens=self.max_tokens,
                 messages=[
                     {
                         "role": "system",
@@ -106,55 +155,37 @@ class PylonAI:
                     },
                 ],
             )
+            self.usage.record("classification", response, time.perf_counter() - start)
             content = (
                 response.choices[0].message.content
                 if response.choices and response.choices[0].message
                 else None
             )
             intent = content.strip() if content else "general_inquiry"
-            return intent
+            return intent, None
         except Exception as e:
             print(f"Error with OpenAI intent classification: {e}")
             for intent in self.intents:
                 if intent.replace("_", " ") in query.lower():
-                    return intent
-            return "general_inquiry"
+                    return intent, None
+            return "general_inquiry", None
 
-    def generate_response(self, intent: str, user_query: str = "") -> str:
+    def generate_response(
+        self, intent: str, user_query: str = "", conversation_summary: str = ""
+    ) -> str:
+        macro_response = self.prompt_builder.macro_for(intent)
         try:
-            with open("fallback_macros/intercom_macros.json") as f:
-                macros = json.load(f)["macros"]
-            macro_response = next(
-                (macro["response"] for macro in macros if macro["intent"] == intent),
-                None,
-            )
-            if not macro_response:
-                macro_response = (
-                    "Thank you for contacting support. How can we help you?"
-                )
-            prompt = (
-                f"You are a helpful customer support agent. "
-                f"A user asked: '{user_query}'. "
-                f"The intent is '{intent}'. "
-                f"Here is a suggested response: '{macro_response}'. "
-                f"Please write a detailed, helpful, and friendly reply in more than 150 words, "
-                f"but less than 200 words, "
-                f"expanding on the macro if possible. "
-                f"Please do not include any other text in your response."
-            )
+            start = time.perf_counter()
             response = client.chat.completions.create(
-                model=MODEL,
-                temperature=TEMPERATURE,
-                top_p=TOP_P,
-                max_tokens=MAX_TOKENS,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a helpful customer support agent.",
-                    },
-                    {"role": "user", "content": prompt},
-                ],
+                model=self.model,
+                temperature=self.temperature,
+                top_p=self.top_p,
+                max_tokens=self.max_tokens,
+                messages=self.prompt_builder.build(
+                    intent, user_query, conversation_summary
+                ),
             )
+            self.usage.record("generation", response, time.perf_counter() - start)
             content = (
                 response.choices[0].message.content
                 if response.choices
@@ -168,15 +199,66 @@ class PylonAI:
                 return macro_response
         except Exception as e:
             print(f"Error with OpenAI response generation: {e}")
-            with open("fallback_macros/intercom_macros.json") as f:
-                macros = json.load(f)["macros"]
-            for macro in macros:
-                if macro["intent"] == intent:
-                    return macro["response"]
-            return "Thank you for contacting support. How can we help you?"
+            return macro_response
+
+    def process_query(
+        self,
+        query: str,
+        conversation_id: str,
+        classification: tuple[str, np.ndarray | None] | None = None,
+        remember: bool = True,
+    ) -> tuple[str, str]:
+        # remember=False previews a reply without touching conversation
+        # context or the reply cache, e.g. for backfill dry runs.
+        context = self.conversations.get(conversation_id)
+        embedding = None
+        if context and is_continuation(query):
+            intent = context.last_intent
+        else:
+            if classification is not None:
+                intent, embedding = classification
+            else:
+                intent, embedding = self.classify_with_embedding(query)
+            # An ambiguous message in an ongoing thread keeps its topic.
+            if context and intent == "general_inquiry":
+                intent = context.last_intent
+        # Replies are shared across customers, so only cache generic queries
+        # outside an ongoing thread whose context the reply should reflect.
+        cacheable = (
+            embedding is not None and context is None and not has_identifiers(query)
+        )
+        response = None
+        if cacheable:
+            response = self.reply_cache.lookup(intent, embedding, query)
+        if response is None:
+            response = self.generate_response(
+                intent,
+                user_query=query,
+                conversation_summary=context.summary if context else "",
+            )
+            # Only cache model replies, not the macro fallback after an error.
+            fallback = self.prompt_builder.macro_for(intent)
+            if remember and cacheable and response != fallback:
+                self.reply_cache.add(intent, embedding, query, response)
+        if remember:
+            self.conversations.update(conversation_id, query, intent, response)
+        return intent, response
 
     def handle_query(self, query: str, conversation_id: str) -> tuple[str, str]:
-        intent = self.classify_intent(query)
-        response = self.generate_response(intent, user_query=query)
-        send_reply(conversation_id, response)
+        if self.profiler is not None and self.profiler.should_sample():
+            with self.profiler.profile():
+                return self._handle_query(query, conversation_id)
+        return self._handle_query(query, conversation_id)
+
+    def _handle_query(self, query: str, conversation_id: str) -> tuple[str, str]:
+        intent, response = self.process_query(query, conversation_id)
+        self.deliver(conversation_id, response)
         return intent, response
+
+    def deliver(self, conversation_id: str, response: str) -> bool:
+        return send_reply(
+            conversation_id,
+            response,
+            client=self.intercom_client,
+            reply_admin_id=self.intercom_admin_id,
+        )
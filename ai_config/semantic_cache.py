@@ -0,0 +1,125 @@
+import re
+import threading
+from collections import deque
+
+import numpy as np
+
+from configs.config import SEMANTIC_CACHE_SIZE, SEMANTIC_CACHE_THRESHOLD
+
+# Digits (order numbers, phone numbers), emails, URLs and capitalized words
+# after the first one (likely names) make a reply specific to one customer.
+IDENTIFIER_PATTERN = re.compile(r"\d|@|https?://|www\.|(?<=\w)[\s,]+(?!I\b)[A-Z]")
+
+
+def has_identifiers(query: str) -> bool:
+    return IDENTIFIER_PATTERN.search(query) is not None
+
+
+class _IntentBucket:
+    def __init__(self, capacity: int, dim: int):
+        self.embeddings = np.zeros((capacity, dim), dtype=np.float32)
+        self.last_used = np.zeros(capacity, dtype=np.int64)
+        self.queries: list[str | None] = [None] * capacity
+        self.replies: list[str | None] = [None] * capacity
+        self.size = 0
+
+
+class SemanticReplyCache:
+    """
+    Reuses generated replies for paraphrased queries of the same intent when
+    the cosine similarity of their embeddings passes a threshold.
+    """
+
+    def __init__(
+        self,
+        capacity_per_intent: int = SEMANTIC_CACHE_SIZE,
+        threshold: float = SEMANTIC_CACHE_THRESHOLD,
+        max_samples: int = 50,
+    ):
+        self.capacity_per_intent = capacity_per_intent
+        self.threshold = threshold
+        self._buckets: dict[str, _IntentBucket] = {}
+        self._clock = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._hit_similarities: deque[float] = deque(maxlen=10000)
+        self.samples: deque[dict] = deque(maxlen=max_samples)
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray | None:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    def lookup(self, intent: str, embedding, query: str = "") -> str | None:
+        vector = self._normalize(embedding)
+        with self._lock:
+            bucket = self._buckets.get(intent)
+            if vector is None or bucket is None or bucket.size == 0:
+                self.misses += 1
+                return None
+            scores = bucket.embeddings[: bucket.size] @ vector
+            best = int(np.argmax(scores))
+            similarity = float(scores[best])
+            if similarity < self.threshold:
+                self.misses += 1
+                return None
+            self._clock += 1
+            bucket.last_used[best] = self._clock
+            self.hits += 1
+            self._hit_similarities.append(similarity)
+            self.samples.append(
+                {
+                    "intent": intent,
+                    "query": query,
+                    "matched_query": bucket.queries[best],
+                    "similarity": similarity,
+                }
+            )
+            return bucket.replies[best]
+
+    def add(self, intent: str, embedding, query: str, reply: str) -> None:
+        vector = self._normalize(embedding)
+        if vector is None:
+            return
+        with self._lock:
+            bucket = self._buckets.get(intent)
+            if bucket is None:
+                bucket = _IntentBucket(self.capacity_per_intent, vector.shape[0])
+                self._buckets[intent] = bucket
+            if bucket.size < self.capacity_per_intent:
+                slot = bucket.size
+                bucket.size += 1
+            else:
+                slot = int(np.argmin(bucket.last_used))
+                self.evictions += 1
+            self._clock += 1
+            bucket.embeddings[slot] = vector
+            bucket.last_used[slot] = self._clock
+            bucket.queries[slot] = query
+            bucket.replies[slot] = reply
+
+    def report(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            similarities = np.array(self._hit_similarities, dtype=np.float32)
+            return {
+                "lookups": lookups,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "threshold": self.threshold,
+                "mean_hit_similarity": (
+                    float(similarities.mean()) if similarities.size else None
+                ),
+                "min_hit_similarity": (
+                    float(similarities.min()) if similarities.size else None
+                ),
+                "entries": {
+                    intent: bucket.size for intent, bucket in self._buckets.items()
+                },
+                "recent_hits": list(self.samples),
+            }
@@ -0,0 +1,182 @@
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from weakref import WeakValueDictionary
+
+from ai_config.embedding_index import EmbeddingIndex
+from ai_config.profiling import QueryProfiler
+from ai_config.pylon_ai import PylonAI
+from configs.config import (
+    MAX_LOADED_TENANTS,
+    MAX_TOKENS,
+    MODEL,
+    TEMPERATURE,
+    TENANTS_PATH,
+    TOP_P,
+)
+
+CREDENTIALS = ("intercom_access_token", "intercom_admin_id")
+UNRESOLVED_VARIABLE = re.compile(r"\$(\w+|\{[^}]*\})")
+
+
+@dataclass
+class TenantConfig:
+    model_config_path: str = "ai_config/pylon_model_config.json"
+    macros_path: str = "fallback_macros/intercom_macros.json"
+    embedding_path: str = "data/sample_embeddings.json"
+    conversation_db_path: str | None = None
+    model: str = MODEL
+    temperature: float = TEMPERATURE
+    top_p: float = TOP_P
+    max_tokens: int = MAX_TOKENS
+    embedding_model: str = MODEL
+    intercom_access_token: str | None = None
+    intercom_admin_id: str | None = None
+
+    def __post_init__(self):
+        if bool(self.intercom_access_token) != bool(self.intercom_admin_id):
+            raise ValueError(
+                "intercom_access_token and intercom_admin_id must be set together"
+            )
+
+
+def parse_tenant_config(config: dict) -> TenantConfig:
+    # Credentials can reference environment variables, e.g.
+    # "${ACME_INTERCOM_ACCESS_TOKEN}", to keep secrets out of the file.
+    values = dict(config)
+    for key in CREDENTIALS:
+        if values.get(key):
+            values[key] = os.path.expandvars(values[key])
+            unresolved = UNRESOLVED_VARIABLE.search(values[key])
+            if unresolved:
+                raise ValueError(
+                    f"{key} references unset environment variable "
+                    f"{unresolved.group(0)}"
+                )
+    return TenantConfig(**values)
+
+
+class TenantRegistry:
+    """
+    Serves many workspaces from one process. Each tenant's intents, macros and
+    embedding index are loaded on first use and kept in an LRU of loaded
+    tenants. The OpenAI client and the Intercom HTTP session are shared, while
+    each tenant may reply through its own Intercom workspace credentials.
+    """
+
+    def __init__(
+        self,
+        registry_path: str | None = TENANTS_PATH,
+        max_loaded: int = MAX_LOADED_TENANTS,
+        profiler: QueryProfiler | None = None,
+    ):
+        self.registry_path = registry_path
+        self.max_loaded = max_loaded
+        self.profiler = profiler if profiler is not None else QueryProfiler.from_env()
+        self._configs: dict[str, TenantConfig] = {}
+        self._registry_mtime = None
+        self._file_tenants: set[str] = set()
+        self._loaded: OrderedDict[str, PylonAI] = OrderedDict()
+        self._loading: dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        # Tenants sharing an embedding_path share one loaded index; it is
+        # freed once no loaded tenant uses it.
+        self._indexes: WeakValueDictionary[str, EmbeddingIndex] = WeakValueDictionary()
+        self._index_lock = threading.Lock()
+
+    def _embedding_index(self, embedding_path: str) -> EmbeddingIndex | None:
+        if not os.path.exists(embedding_path):
+            return None
+        key = os.path.abspath(embedding_path)
+        with self._index_lock:
+            index = self._indexes.get(key)
+            if index is None:
+                index = EmbeddingIndex.load(embedding_path)
+                self._indexes[key] = index
+        return index
+
+    def _refresh(self) -> None:
+        # Re-read the registry file when it changes so tenants can be added
+        # and removed without restarting the process.
+        if not self.registry_path or not os.path.exists(self.registry_path):
+            return
+        mtime = os.path.getmtime(self.registry_path)
+        if mtime == self._registry_mtime:
+            return
+        # Record the mtime first so a bad file is reported once rather than on
+        # every lookup; it is read again when it next changes.
+        self._registry_mtime = mtime
+        try:
+            with open(self.registry_path) as f:
+                tenants = json.load(f)["tenants"]
+            if not isinstance(tenants, dict):
+                raise ValueError("'tenants' must be an object")
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"Error reading {self.registry_path}, keeping previous tenants: {e}")
+            return
+        configs = {}
+        for tenant_id, config in tenants.items():
+            try:
+                configs[tenant_id] = parse_tenant_config(config)
+            except (TypeError, ValueError) as e:
+                print(f"Invalid config for tenant '{tenant_id}', not updated: {e}")
+                if tenant_id in self._configs:
+                    configs[tenant_id] = self._configs[tenant_id]
+        for tenant_id in self._file_tenants - tenants.keys():
+            self._configs.pop(tenant_id, None)
+            self._loaded.pop(tenant_id, None)
+        for tenant_id, config in configs.items():
+            if self._configs.get(tenant_id) != config:
+                self._configs[tenant_id] = config
+                self._loaded.pop(tenant_id, None)
+        self._file_tenants = set(tenants)
+
+    def register(self, tenant_id: str, config: TenantConfig) -> None:
+        with self._lock:
+            self._configs[tenant_id] = config
+            self._loaded.pop(tenant_id, None)
+            self._file_tenants.discard(tenant_id)
+
+    def config_for(self, tenant_id: str) -> TenantConfig:
+        with self._lock:
+            self._refresh()
+            if tenant_id not in self._configs:
+                raise KeyError(f"Unknown tenant '{tenant_id}'")
+            return self._configs[tenant_id]
+
+    @property
+    def loaded_tenants(self) -> list[str]:
+        with self._lock:
+            return list(self._loaded)
+
+    def get(self, tenant_id: str) -> PylonAI:
+        config = self.config_for(tenant_id)
+        with self._lock:
+            ai = self._loaded.get(tenant_id)
+            if ai is not None:
+                self._loaded.move_to_end(tenant_id)
+                return ai
+            loading = self._loading.setdefault(tenant_id, threading.Lock())
+        # Load outside the registry lock so other tenants keep being served.
+        with loading:
+            with self._lock:
+                ai = self._loaded.get(tenant_id)
+            if ai is None:
+                ai = PylonAI(
+                    **asdict(config),
+                    profiler=self.profiler,
+                    embedding_index=self._embedding_index(config.embedding_path),
+                )
+                with self._lock:
+                    self._loaded[tenant_id] = ai
+                    while len(self._loaded) > self.max_loaded:
+                        self._loaded.popitem(last=False)
+        return ai
+
+    def handle_query(
+        self, tenant_id: str, query: str, conversation_id: str
+    ) -> tuple[str, str]:
+        return self.get(tenant_id).handle_query(query, conversation_id)
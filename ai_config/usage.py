@@ -0,0 +1,47 @@
+import threading
+from collections import deque
+
+
+class TokenUsageLog:
+    """
+    Records prompt and completion tokens per model call, keeping the most
+    recent calls and running totals for cost and latency reporting.
+    """
+
+    def __init__(self, max_records: int = 1000):
+        self.records: deque[dict] = deque(maxlen=max_records)
+        self.totals = {
+            "calls": 0,
+            "prompt_tokens": 0,
+            "cached_tokens": 0,
+            "completion_tokens": 0,
+            "latency": 0.0,
+        }
+        self._lock = threading.Lock()
+
+    def record(self, kind: str, response, latency: float) -> dict:
+        usage = getattr(response, "usage", None)
+        details = getattr(usage, "prompt_tokens_details", None)
+        entry = {
+            "kind": kind,
+            "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+            "cached_tokens": getattr(details, "cached_tokens", 0) or 0,
+            "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+            "latency": latency,
+        }
+        with self._lock:
+            self.records.append(entry)
+            self.totals["calls"] += 1
+            for key in ("prompt_tokens", "cached_tokens", "completion_tokens"):
+                self.totals[key] += entry[key]
+            self.totals["latency"] += latency
+        return entry
+
+    def summary(self) -> dict:
+        with self._lock:
+            totals = dict(self.totals)
+        calls = totals["calls"] or 1
+        totals["avg_prompt_tokens"] = totals["prompt_tokens"] / calls
+        totals["avg_completion_tokens"] = totals["completion_tokens"] / calls
+        totals["avg_latency"] = totals["latency"] / calls
+        return totals
@@ -0,0 +1,227 @@
+import argparse
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Iterator
+
+from ai_config.pylon_ai import PylonAI
+from ai_config.tenant_registry import TenantRegistry
+from configs.config import (
+    BACKFILL_BATCH_SIZE,
+    BACKFILL_CONCURRENCY,
+    BACKFILL_SEND_RATE,
+)
+
+
+class RateLimiter:
+    """
+    Spaces calls at least 1 / rate seconds apart across threads.
+    """
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+def load_checkpoint(checkpoint_path: str) -> set[int]:
+    if not os.path.exists(checkpoint_path):
+        return set()
+    with open(checkpoint_path) as f:
+        return {int(line) for line in f if line.strip()}
+
+
+def read_records(input_path: str, done: set[int]) -> Iterator[tuple[int, dict]]:
+    with open(input_path) as f:
+        for line_no, line in enumerate(f):
+            if line_no in done or not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                record["conversation_id"] = str(record["conversation_id"])
+                record["query"] = str(record["query"])
+            except (ValueError, KeyError, TypeError) as e:
+                print(f"Skipping invalid record on line {line_no + 1}: {e}")
+                continue
+            yield line_no, record
+
+
+def batched(records: Iterator, size: int) -> Iterator[list]:
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def dry_run_path(output_path: str) -> str:
+    root, ext = os.path.splitext(output_path)
+    return f"{root}.dryrun{ext or '.jsonl'}"
+
+
+def run_backfill(
+    ai: PylonAI,
+    input_path: str,
+    output_path: str,
+    checkpoint_path: str,
+    concurrency: int = BACKFILL_CONCURRENCY,
+    batch_size: int = BACKFILL_BATCH_SIZE,
+    send_rate: float = BACKFILL_SEND_RATE,
+    dry_run: bool = False,
+) -> dict:
+    done = load_checkpoint(checkpoint_path)
+    limiter = RateLimiter(send_rate)
+    write_lock = threading.Lock()
+    stats = {"processed": 0, "failed": 0, "skipped": len(done)}
+    # Conversations with a failed message; their later messages wait for the
+    # resumed run so they are still sent in order.
+    blocked: set[str] = set()
+
+    # Dry runs leave the checkpoint and conversation state alone so the real
+    # replay behaves as if the preview never happened; each preview replaces
+    # the previous preview's results.
+    with (
+        open(output_path, "w" if dry_run else "a") as results,
+        open(os.devnull if dry_run else checkpoint_path, "a") as checkpoint,
+        ThreadPoolExecutor(max_workers=concurrency) as pool,
+    ):
+
+        def process_conversation(items: list[tuple[int, dict, tuple]]) -> None:
+            # Messages of one conversation run in order on a single worker.
+            for index, (line_no, record, classification) in enumerate(items):
+                conversation_id = record["conversation_id"]
+                start = time.perf_counter()
+                try:
+                    intent, response = ai.process_query(
+                        record["query"],
+                        conversation_id,
+                        classification,
+                        remember=not dry_run,
+                    )
+                    if not dry_run:
+                        limiter.wait()
+                        if not ai.deliver(conversation_id, response):
+                            raise RuntimeError("reply was not delivered")
+                except Exception as e:
+                    print(f"Error processing conversation {conversation_id}: {e}")
+                    with write_lock:
+                        blocked.add(conversation_id)
+                        stats["failed"] += len(items) - index
+                    return
+                result = {
+                    "conversation_id": conversation_id,
+                    "query": record["query"],
+                    "intent": intent,
+                    "response": response,
+                    "sent": not dry_run,
+                    "latency": time.perf_counter() - start,
+                }
+                with write_lock:
+                    results.write(json.dumps(result) + "\n")
+                    results.flush()
+                    checkpoint.write(f"{line_no}\n")
+                    checkpoint.flush()
+                    stats["processed"] += 1
+
+        for batch in batched(read_records(input_path, done), batch_size):
+            with write_lock:
+                pending = [
+                    item for item in batch if item[1]["conversation_id"] not in blocked
+                ]
+                stats["failed"] += len(batch) - len(pending)
+            if not pending:
+                continue
+            batch = pending
+            queries = [record["query"] for _, record in batch]
+            try:
+                classifications = ai.classify_batch(queries)
+            except Exception as e:
+                print(f"Error classifying batch of {len(batch)} records: {e}")
+                with write_lock:
+                    blocked.update(record["conversation_id"] for _, record in batch)
+                    stats["failed"] += len(batch)
+                continue
+            conversations: OrderedDict[str, list] = OrderedDict()
+            for (line_no, record), classification in zip(batch, classifications):
+                conversations.setdefault(record["conversation_id"], []).append(
+                    (line_no, record, classification)
+                )
+            futures = [
+                pool.submit(process_conversation, items)
+                for items in conversations.values()
+            ]
+            for future in as_completed(futures):
+                future.result()
+    return stats
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Replay queued conversations from a JSONL file through PylonAI."
+    )
+    parser.add_argument("input", help="JSONL file of {conversation_id, query}.")
+    parser.add_argument(
+        "--output",
+        default="backfill_results.jsonl",
+        help="Results JSONL; dry runs write <name>.dryrun.jsonl next to it.",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        help="File of processed input line numbers (default: <output>.checkpoint).",
+    )
+    parser.add_argument("--concurrency", type=int, default=BACKFILL_CONCURRENCY)
+    parser.add_argument("--batch-size", type=int, default=BACKFILL_BATCH_SIZE)
+    parser.add_argument(
+        "--send-rate",
+        type=float,
+        default=BACKFILL_SEND_RATE,
+        help="Maximum replies sent per second (0 for no limit).",
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="Generate replies without sending."
+    )
+    parser.add_argument("--model-config", default="ai_config/pylon_model_config.json")
+    parser.add_argument(
+        "--tenant", help="Replay for this tenant from the tenant registry."
+    )
+    args = parser.parse_args(argv)
+
+    if args.tenant:
+        ai = TenantRegistry().get(args.tenant)
+    else:
+        ai = PylonAI(args.model_config)
+    output = dry_run_path(args.output) if args.dry_run else args.output
+    stats = run_backfill(
+        ai,
+        args.input,
+        output,
+        args.checkpoint or f"{args.output}.checkpoint",
+        concurrency=args.concurrency,
+        batch_size=args.batch_size,
+        send_rate=args.send_rate,
+        dry_run=args.dry_run,
+    )
+    print(
+        f"Processed {stats['processed']} records, {stats['failed']} failed, "
+        f"{stats['skipped']} already done."
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -3,3 +3,17 @@ MAX_TOKENS = 200
 MODEL = "openai/gpt-4.1-mini"
 TEMPERATURE = 0.3
 TOP_P = 0.7
+MAX_QUERY_TOKENS = 512
+TOKENIZER_ENCODING = "o200k_base"
+CONVERSATION_CACHE_SIZE = 10000
+CONVERSATION_TTL = 24 * 60 * 60
+CONVERSATION_SUMMARY_CHARS = 500
+SEMANTIC_CACHE_SIZE = 256
+SEMANTIC_CACHE_THRESHOLD = 0.92
+BACKFILL_BATCH_SIZE = 32
+BACKFILL_CONCURRENCY = 4
+BACKFILL_SEND_RATE = 5.0
+PROFILE_INTERVAL = 0.005
+PROFILE_OUTPUT = "profiles/handle_query.collapsed"
+TENANTS_PATH = "ai_config/tenants.json"
+MAX_LOADED_TENANTS = 8
@@ -10,21 +10,36 @@ intercom = Client(personal_access_token=os.getenv("INTERCOM_ACCESS_TOKEN", ""))
 admin_id = os.getenv("INTERCOM_ADMIN_ID", "1234567890")
 
 
+def workspace_client(personal_access_token: str) -> Client:
+    # Each workspace authenticates with its own token but reuses the
+    # default client's HTTP session and connection pool.
+    client = Client(personal_access_token=personal_access_token)
+    client.http_session = intercom.http_session
+    return client
+
+
 def send_reply(
     conversation_id: str,
     message: str,
     message_type: str = "comment",
     reply_type: str = "admin",
     user_id: str = "user_1",
-) -> None:
+    client: Client | None = None,
+    reply_admin_id: str | None = None,
+) -> bool:
+    if client is not None and not reply_admin_id:
+        # Never reply to another workspace's conversation as the default admin.
+        raise ValueError("reply_admin_id is required with a workspace client")
     try:
-        intercom.conversations.reply(
+        (client or intercom).conversations.reply(
             id=conversation_id,
             type=reply_type,
-            admin_id=admin_id if reply_type == "admin" else user_id,
+            admin_id=(reply_admin_id or admin_id) if reply_type == "admin" else user_id,
             message_type=message_type,
             body=message,
         )
         print(f"Message sent to conversation {conversation_id}")
+        return True
     except Exception as e:
         print(f"Error sending message: {e}")
+        return False
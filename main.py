@@ -1,21 +1,52 @@
+import argparse
+
+from ai_config.profiling import QueryProfiler
 from ai_config.pylon_ai import PylonAI
+from ai_config.tenant_registry import TenantRegistry
+from configs.config import PROFILE_OUTPUT
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Bubbles AI Reply System")
+    parser.add_argument(
+        "--profile",
+        type=float,
+        metavar="RATE",
+        help="Profile this fraction of queries (0-1), e.g. 1.0 for every query.",
+    )
+    parser.add_argument("--profile-output", default=PROFILE_OUTPUT)
+    parser.add_argument("--tenant", help="Serve this tenant from the tenant registry.")
+    args = parser.parse_args()
+
     print("Bubbles AI Reply System - Local Test Mode\n")
-    ai = PylonAI("ai_config/pylon_model_config.json")
-    while True:
-        query = input("Enter a customer query (or 'quit' to exit): ")
-        if query.strip().lower() == "quit":
-            break
-        conversation_id = (
-            input("Enter a conversation ID (or leave blank for dummy): ")
-            or "dummy_convo_id"
-        )
-        intent, response = ai.handle_query(query, conversation_id)
-        print(f"\nIntent classified: {intent}")
-        print(f"Generated response:\n{response}\n")
-        print("-" * 40)
+    profiler = None
+    if args.profile:
+        profiler = QueryProfiler(args.profile, args.profile_output)
+    if args.tenant:
+        ai = TenantRegistry(profiler=profiler).get(args.tenant)
+    else:
+        ai = PylonAI("ai_config/pylon_model_config.json", profiler=profiler)
+    try:
+        while True:
+            query = input("Enter a customer query (or 'quit' to exit): ")
+            if query.strip().lower() == "quit":
+                break
+            conversation_id = (
+                input("Enter a conversation ID (or leave blank for dummy): ")
+                or "dummy_convo_id"
+            )
+            intent, response = ai.handle_query(query, conversation_id)
+            print(f"\nIntent classified: {intent}")
+            print(f"Generated response:\n{response}\n")
+            print("-" * 40)
+    except (EOFError, KeyboardInterrupt):
+        print()
+    finally:
+        # Keep samples collected before EOF or Ctrl-C.
+        if ai.profiler is not None:
+            path = ai.profiler.write_collapsed()
+            if path:
+                print(f"Profile written to {path}")
 
 
 if __name__ == "__main__":
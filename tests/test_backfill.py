@@ -0,0 +1,213 @@
+import json
+
+import pytest
+from backfill import RateLimiter, dry_run_path, main, run_backfill
+
+
+class FakeAI:
+    def __init__(self, fail_on: str | None = None, classify_error: bool = False):
+        self.fail_on = fail_on
+        self.classify_error = classify_error
+        self.batches = []
+        self.processed = []
+
+    def classify_batch(self, queries):
+        if self.classify_error:
+            raise RuntimeError("embeddings unavailable")
+        self.batches.append(list(queries))
+        return [("refund_request", None) for _ in queries]
+
+    @staticmethod
+    def send(conversation_id, message):
+        return True
+
+    def deliver(self, conversation_id, message):
+        return self.send(conversation_id, message)
+
+    def process_query(self, query, conversation_id, classification=None, remember=True):
+        if query == self.fail_on:
+            raise RuntimeError("model unavailable")
+        self.processed.append((conversation_id, query))
+        return classification[0], f"reply to {query}"
+
+
+@pytest.fixture
+def input_path(tmp_path):
+    path = tmp_path / "queued.jsonl"
+    records = [
+        {"conversation_id": "c1", "query": "refund please"},
+        {"conversation_id": "c2", "query": "money back"},
+        "not json",
+        {"conversation_id": "c1", "query": "also, how long?"},
+        {"conversation_id": "c3", "query": "broken"},
+    ]
+    path.write_text(
+        "\n".join(r if isinstance(r, str) else json.dumps(r) for r in records)
+    )
+    return path
+
+
+def recorder(sent: list, fail: set = frozenset()):
+    def fake_send_reply(conversation_id: str, message: str) -> bool:
+        if conversation_id in fail:
+            return False
+        sent.append(conversation_id)
+        return True
+
+    return fake_send_reply
+
+
+def test_dry_run_writes_results_without_sending(
+    tmp_path, input_path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    sent = []
+    monkeypatch.setattr(FakeAI, "send", staticmethod(recorder(sent)))
+    ai = FakeAI()
+    output = tmp_path / "results.jsonl"
+    stats = run_backfill(
+        ai,
+        str(input_path),
+        str(output),
+        str(tmp_path / "ckpt"),
+        batch_size=2,
+        dry_run=True,
+    )
+    assert stats == {"processed": 4, "failed": 0, "skipped": 0}
+    assert sent == []
+    assert ai.batches == [
+        ["refund please", "money back"],
+        ["also, how long?", "broken"],
+    ]
+    results = [json.loads(line) for line in output.read_text().splitlines()]
+    assert {r["conversation_id"] for r in results} == {"c1", "c2", "c3"}
+    assert all(not r["sent"] and r["intent"] == "refund_request" for r in results)
+    assert not (tmp_path / "ckpt").exists()
+
+
+def test_real_run_after_dry_run_sends_everything(
+    tmp_path, input_path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    sent = []
+    monkeypatch.setattr(FakeAI, "send", staticmethod(recorder(sent)))
+    output, checkpoint = str(tmp_path / "results.jsonl"), str(tmp_path / "ckpt")
+    run_backfill(FakeAI(), str(input_path), output, checkpoint, dry_run=True)
+    stats = run_backfill(FakeAI(), str(input_path), output, checkpoint, send_rate=0)
+    assert stats == {"processed": 4, "failed": 0, "skipped": 0}
+    assert sorted(sent) == ["c1", "c1", "c2", "c3"]
+
+
+def test_resume_skips_checkpointed_records(
+    tmp_path, input_path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    sent = []
+    monkeypatch.setattr(FakeAI, "send", staticmethod(recorder(sent)))
+    output, checkpoint = tmp_path / "results.jsonl", tmp_path / "ckpt"
+    first = run_backfill(
+        FakeAI(fail_on="broken"),
+        str(input_path),
+        str(output),
+        str(checkpoint),
+        send_rate=0,
+    )
+    assert first == {"processed": 3, "failed": 1, "skipped": 0}
+    ai = FakeAI()
+    second = run_backfill(ai, str(input_path), str(output), str(checkpoint))
+    assert second == {"processed": 1, "failed": 0, "skipped": 3}
+    assert ai.processed == [("c3", "broken")]
+    assert sorted(sent) == ["c1", "c1", "c2", "c3"]
+    assert len(output.read_text().splitlines()) == 4
+
+
+def test_rate_limiter_spaces_calls(monkeypatch: pytest.MonkeyPatch) -> None:
+    sleeps = []
+    monkeypatch.setattr("backfill.time.sleep", sleeps.append)
+    limiter = RateLimiter(rate=10)
+    for _ in range(3):
+        limiter.wait()
+    assert len(sleeps) == 2
+    assert sleeps[-1] == pytest.approx(0.2, abs=0.05)
+
+
+def test_failed_delivery_is_retried_on_resume(
+    tmp_path, input_path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    sent = []
+    output, checkpoint = tmp_path / "results.jsonl", tmp_path / "ckpt"
+    monkeypatch.setattr(FakeAI, "send", staticmethod(recorder(sent, fail={"c1"})))
+    first = run_backfill(
+        FakeAI(), str(input_path), str(output), str(checkpoint), send_rate=0
+    )
+    # Both c1 messages wait for the retry so they are still sent in order.
+    assert first == {"processed": 2, "failed": 2, "skipped": 0}
+    assert all('"sent": true' in line for line in output.read_text().splitlines())
+    monkeypatch.setattr(FakeAI, "send", staticmethod(recorder(sent)))
+    ai = FakeAI()
+    second = run_backfill(ai, str(input_path), str(output), str(checkpoint))
+    assert second == {"processed": 2, "failed": 0, "skipped": 2}
+    assert ai.processed == [("c1", "refund please"), ("c1", "also, how long?")]
+
+
+def test_classification_error_fails_records_without_aborting(
+    tmp_path, input_path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(FakeAI, "send", staticmethod(recorder([])))
+    output, checkpoint = str(tmp_path / "results.jsonl"), str(tmp_path / "ckpt")
+    stats = run_backfill(
+        FakeAI(classify_error=True), str(input_path), output, checkpoint, batch_size=2
+    )
+    assert stats == {"processed": 0, "failed": 4, "skipped": 0}
+    stats = run_backfill(FakeAI(), str(input_path), output, checkpoint, send_rate=0)
+    assert stats["processed"] == 4
+
+
+def test_failed_conversation_is_held_back_across_batches(
+    tmp_path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    path = tmp_path / "queued.jsonl"
+    path.write_text(
+        "\n".join(
+            json.dumps({"conversation_id": cid, "query": query})
+            for cid, query in [("c1", "first"), ("c2", "other"), ("c1", "second")]
+        )
+    )
+    sent = []
+    output, checkpoint = str(tmp_path / "results.jsonl"), str(tmp_path / "ckpt")
+    monkeypatch.setattr(FakeAI, "send", staticmethod(recorder(sent, fail={"c1"})))
+    first = run_backfill(
+        FakeAI(), str(path), output, checkpoint, batch_size=1, send_rate=0
+    )
+    assert first == {"processed": 1, "failed": 2, "skipped": 0}
+    assert sent == ["c2"]
+    monkeypatch.setattr(FakeAI, "send", staticmethod(recorder(sent)))
+    ai = FakeAI()
+    run_backfill(ai, str(path), output, checkpoint, batch_size=1, send_rate=0)
+    assert ai.processed == [("c1", "first"), ("c1", "second")]
+
+    ai = FakeAI(classify_error=True)
+    checkpoint = str(tmp_path / "ckpt2")
+    stats = run_backfill(ai, str(path), output, checkpoint, batch_size=1)
+    assert stats == {"processed": 0, "failed": 3, "skipped": 0}
+
+
+def test_dry_run_cli_writes_separate_results(
+    tmp_path, input_path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    ai = FakeAI()
+    previews = []
+    monkeypatch.setattr("backfill.PylonAI", lambda config: ai)
+    monkeypatch.setattr(
+        FakeAI,
+        "process_query",
+        lambda self, query, cid, classification=None, remember=True: (
+            previews.append(remember) or ("refund_request", "reply")
+        ),
+    )
+    output = tmp_path / "results.jsonl"
+    for _ in range(2):
+        main([str(input_path), "--output", str(output), "--dry-run"])
+    preview = tmp_path / "results.dryrun.jsonl"
+    assert dry_run_path(str(output)) == str(preview)
+    assert len(preview.read_text().splitlines()) == 4
+    assert not output.exists()
+    assert not (tmp_path / "results.jsonl.checkpoint").exists()
+    assert previews and not any(previews)
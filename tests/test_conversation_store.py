@@ -0,0 +1,88 @@
+import pytest
+from ai_config.conversation_store import (
+    ConversationStore,
+    is_continuation,
+    roll_summary,
+)
+from configs.config import CONVERSATION_SUMMARY_CHARS
+
+
+@pytest.mark.parametrize(
+    "query,expected",
+    [
+        ("Also, how long will it take?", True),
+        ("thanks, any update on that?", True),
+        ("ok", True),
+        ("Any update?", True),
+        ("Also I need a password reset", False),
+        ("I want a refund for my last purchase.", False),
+        ("nothing arrived", False),
+        ("No, I want to change my email", False),
+        ("that is fine, please cancel my subscription", False),
+        ("Also my password does not work", False),
+        ("This app keeps crashing when I pay", False),
+        ("Any update on order 1234?", False),
+        ("", False),
+    ],
+)
+def test_is_continuation(query: str, expected: bool) -> None:
+    assert is_continuation(query) is expected
+
+
+def test_store_keeps_last_intent_and_summary() -> None:
+    store = ConversationStore()
+    store.update("c1", "I want my money back", "refund_request", "Sure.")
+    context = store.update("c1", "Also, how long?", "refund_request", "3 days.")
+    assert context.last_intent == "refund_request"
+    assert context.last_reply == "3 days."
+    assert context.turns == 2
+    assert "I want my money back" in context.summary
+    assert store.get("c1") == context
+
+
+def test_summary_is_bounded() -> None:
+    summary = ""
+    for i in range(100):
+        summary = roll_summary(summary, "general_inquiry", f"message {i} " * 10)
+    assert len(summary) <= CONVERSATION_SUMMARY_CHARS
+    assert "message 99" in summary
+
+
+def test_store_evicts_least_recently_used() -> None:
+    store = ConversationStore(max_conversations=2)
+    store.update("a", "q", "general_inquiry", "r")
+    store.update("b", "q", "general_inquiry", "r")
+    store.get("a")
+    store.update("c", "q", "general_inquiry", "r")
+    assert len(store) == 2
+    assert store.get("b") is None
+    assert store.get("a") is not None
+
+
+def test_store_expires_after_ttl() -> None:
+    store = ConversationStore(ttl=-1)
+    store.update("a", "q", "general_inquiry", "r")
+    assert store.get("a") is None
+
+
+def test_store_reloads_evicted_conversations_from_disk(tmp_path) -> None:
+    store = ConversationStore(max_conversations=1, db_path=str(tmp_path / "c.db"))
+    store.update("a", "I want a refund", "refund_request", "r")
+    store.update("b", "q", "general_inquiry", "r")
+    assert len(store) == 1
+    assert store.get("a").last_intent == "refund_request"
+    reopened = ConversationStore(db_path=str(tmp_path / "c.db"))
+    assert reopened.get("b").last_intent == "general_inquiry"
+
+
+def test_update_purges_expired_rows_from_disk(
+    tmp_path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr("ai_config.conversation_store.PURGE_EVERY", 2)
+    store = ConversationStore(db_path=str(tmp_path / "c.db"), ttl=-1)
+    store.update("a", "q", "bug_report", "r")
+    count = "SELECT COUNT(*) FROM conversations"
+    assert store._db.execute(count).fetchone()[0] == 1
+    store.update("b", "q", "bug_report", "r")
+    rows = store._db.execute(count).fetchone()[0]
+    assert rows == 0
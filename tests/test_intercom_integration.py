@@ -44,7 +44,7 @@ def patch_intercom(
 
 
 def test_send_reply_success(patch_intercom: DummyIntercom) -> None:
-    send_reply("user_1", "Hello!")
+    assert send_reply("user_1", "Hello!") is True
     assert patch_intercom.last is not None
     assert patch_intercom.last["kwargs"]["id"] == "user_1"
     assert patch_intercom.last["kwargs"]["body"] == "Hello!"
@@ -62,6 +62,16 @@ def test_send_reply_error(monkeypatch: pytest.MonkeyPatch) -> None:
     send_reply("user_2", "Test error handling")
 
 
+def test_send_reply_reports_failure(
+    patch_intercom: DummyIntercom, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    def fail_reply(**kwargs) -> None:
+        raise Exception("API error simulated")
+
+    monkeypatch.setattr(patch_intercom.conversations, "reply", fail_reply)
+    assert send_reply("user_2", "Test error handling") is False
+
+
 def test_reply_with_note(patch_intercom: DummyIntercom) -> None:
     send_reply("user_3", "Internal note here", message_type="note")
     assert patch_intercom.last is not None
@@ -88,3 +98,16 @@ def test_reply_as_user(patch_intercom: DummyIntercom) -> None:
     assert patch_intercom.last["kwargs"]["type"] == "user"
     assert patch_intercom.last["kwargs"]["id"] == "conv_123"
     assert patch_intercom.last["kwargs"]["body"] == "Replying as user"
+
+
+def test_reply_through_workspace_client(patch_intercom: DummyIntercom) -> None:
+    workspace = DummyIntercom()
+    send_reply("conv_5", "Hello!", client=workspace, reply_admin_id="42")
+    assert patch_intercom.last is None
+    assert workspace.last["kwargs"]["admin_id"] == "42"
+
+
+def test_workspace_client_requires_admin_id(patch_intercom: DummyIntercom) -> None:
+    with pytest.raises(ValueError):
+        send_reply("conv_6", "Hello!", client=DummyIntercom())
+    assert patch_intercom.last is None
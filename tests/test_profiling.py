@@ -0,0 +1,52 @@
+import time
+
+import pytest
+from ai_config.profiling import QueryProfiler
+
+
+def busy_work(seconds: float) -> None:
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def test_from_env_is_disabled_by_default(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv("PYLON_PROFILE_RATE", raising=False)
+    assert QueryProfiler.from_env() is None
+    monkeypatch.setenv("PYLON_PROFILE_RATE", "0.25")
+    monkeypatch.setenv("PYLON_PROFILE_OUTPUT", "out.collapsed")
+    profiler = QueryProfiler.from_env()
+    assert profiler.sample_rate == 0.25
+    assert profiler.output_path == "out.collapsed"
+    assert QueryProfiler.from_env() is profiler
+
+
+def test_malformed_env_rate_disables_profiling(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setenv("PYLON_PROFILE_RATE", "ten percent")
+    assert QueryProfiler.from_env() is None
+
+
+def test_sample_rate_bounds() -> None:
+    assert not any(QueryProfiler(0.0).should_sample() for _ in range(100))
+    assert all(QueryProfiler(1.0).should_sample() for _ in range(100))
+
+
+def test_profiled_calls_aggregate_into_collapsed_stacks(tmp_path) -> None:
+    profiler = QueryProfiler(1.0, str(tmp_path / "out" / "profile.collapsed"))
+    for _ in range(2):
+        with profiler.profile():
+            busy_work(0.05)
+    assert profiler.calls_profiled == 2
+    path = profiler.write_collapsed()
+    lines = open(path).read().splitlines()
+    assert lines
+    stack, count = lines[0].rsplit(" ", 1)
+    assert int(count) > 0
+    assert any("busy_work (test_profiling.py" in line for line in lines)
+
+
+def test_nothing_written_without_samples(tmp_path) -> None:
+    profiler = QueryProfiler(1.0, str(tmp_path / "profile.collapsed"))
+    assert profiler.write_collapsed() is None
@@ -0,0 +1,83 @@
+from types import SimpleNamespace
+
+import pytest
+from ai_config.prompt_builder import (
+    DEFAULT_MACRO,
+    TRUNCATION_MARKER,
+    PromptBuilder,
+    Tokenizer,
+    load_macros,
+)
+from ai_config.usage import TokenUsageLog
+
+
+@pytest.fixture(scope="module")
+def builder() -> PromptBuilder:
+    return PromptBuilder(load_macros("fallback_macros/intercom_macros.json"))
+
+
+def test_prefix_is_stable_per_intent(builder: PromptBuilder) -> None:
+    first = builder.build("refund_request", "I want my money back.")
+    second = builder.build("refund_request", "Can I get a refund?")
+    assert first[0] == second[0]
+    assert first[0]["role"] == "system"
+    assert first[-1] == {"role": "user", "content": "I want my money back."}
+    assert builder.macros["refund_request"] in first[0]["content"]
+
+
+def test_unknown_intent_uses_default_macro(builder: PromptBuilder) -> None:
+    messages = builder.build("unknown_intent")
+    assert DEFAULT_MACRO in messages[0]["content"]
+    assert messages[-1]["content"]
+
+
+def test_long_query_is_truncated_to_budget() -> None:
+    tokenizer = Tokenizer()
+    builder = PromptBuilder({}, max_query_tokens=50, tokenizer=tokenizer)
+    query = "My order never arrived. " + "blah " * 2000 + "Please refund me."
+    content = builder.build("refund_request", query)[-1]["content"]
+    assert TRUNCATION_MARKER in content
+    assert content.startswith("My order")
+    assert content.endswith("refund me.")
+    assert tokenizer.count(content) <= 50 + tokenizer.count(TRUNCATION_MARKER)
+
+
+def test_usage_log_records_tokens() -> None:
+    log = TokenUsageLog()
+    response = SimpleNamespace(
+        usage=SimpleNamespace(
+            prompt_tokens=120,
+            completion_tokens=80,
+            prompt_tokens_details=SimpleNamespace(cached_tokens=100),
+        )
+    )
+    log.record("generation", response, 0.5)
+    log.record("generation", SimpleNamespace(usage=None), 0.1)
+    summary = log.summary()
+    assert summary["calls"] == 2
+    assert summary["prompt_tokens"] == 120
+    assert summary["cached_tokens"] == 100
+    assert summary["completion_tokens"] == 80
+    assert summary["avg_latency"] == pytest.approx(0.3)
+
+
+def test_conversation_summary_sits_between_prefix_and_query(
+    builder: PromptBuilder,
+) -> None:
+    messages = builder.build(
+        "refund_request", "Also, how long?", "refund_request: I want a refund"
+    )
+    assert messages[0] == builder.system_message("refund_request")
+    assert "I want a refund" in messages[1]["content"]
+    assert messages[-1]["content"] == "Also, how long?"
+
+
+def test_tokenizer_is_shared_across_builders() -> None:
+    assert PromptBuilder({}).tokenizer is PromptBuilder({}).tokenizer
+
+
+def test_only_known_intents_are_memoized(builder: PromptBuilder) -> None:
+    builder.system_message("refund_request")
+    builder.system_message("Refund request, probably.")
+    assert "refund_request" in builder._system_messages
+    assert "Refund request, probably." not in builder._system_messages
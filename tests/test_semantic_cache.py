@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+from ai_config.pylon_ai import PylonAI
+from ai_config.semantic_cache import SemanticReplyCache, has_identifiers
+
+
+@pytest.fixture
+def ai(monkeypatch: pytest.MonkeyPatch) -> PylonAI:
+    ai = PylonAI("ai_config/pylon_model_config.json", embedding_path="missing.json")
+    # Every query looks like the same paraphrase to the cache.
+    monkeypatch.setattr(
+        ai,
+        "classify_with_embedding",
+        lambda query: ("delivery_status", np.array([1.0, 0.0])),
+    )
+    monkeypatch.setattr(
+        ai,
+        "generate_response",
+        lambda intent, user_query="", conversation_summary="": f"Re: {user_query}",
+    )
+    return ai
+
+
+def test_paraphrase_reuses_reply() -> None:
+    cache = SemanticReplyCache(threshold=0.9)
+    cache.add("refund_request", [1.0, 0.0, 0.1], "Can I get my money back?", "Yes.")
+    reply = cache.lookup("refund_request", [0.98, 0.0, 0.12], "I want my money back")
+    assert reply == "Yes."
+    report = cache.report()
+    assert report["hits"] == 1
+    assert report["recent_hits"][0]["matched_query"] == "Can I get my money back?"
+
+
+def test_lookup_misses_other_intent_or_dissimilar_query() -> None:
+    cache = SemanticReplyCache(threshold=0.9)
+    cache.add("refund_request", [1.0, 0.0], "Refund please", "Yes.")
+    assert cache.lookup("payment_issue", [1.0, 0.0]) is None
+    assert cache.lookup("refund_request", [0.0, 1.0]) is None
+    assert cache.lookup("refund_request", [0.0, 0.0]) is None
+    report = cache.report()
+    assert report["misses"] == 3
+    assert report["hit_rate"] == 0.0
+
+
+def test_least_recently_used_entry_is_evicted() -> None:
+    cache = SemanticReplyCache(capacity_per_intent=2, threshold=0.99)
+    basis = np.eye(3)
+    cache.add("bug_report", basis[0], "a", "reply a")
+    cache.add("bug_report", basis[1], "b", "reply b")
+    assert cache.lookup("bug_report", basis[0]) == "reply a"
+    cache.add("bug_report", basis[2], "c", "reply c")
+    assert cache.lookup("bug_report", basis[1]) is None
+    assert cache.lookup("bug_report", basis[0]) == "reply a"
+    assert cache.lookup("bug_report", basis[2]) == "reply c"
+    report = cache.report()
+    assert report["entries"] == {"bug_report": 2}
+    assert report["evictions"] == 1
+
+
+@pytest.mark.parametrize(
+    "query,expected",
+    [
+        ("Can I get my money back?", False),
+        ("Refund please. Thanks", False),
+        ("My order #1234 hasn't arrived", True),
+        ("Send it to jane@example.com", True),
+        ("Hi, this is Sarah Lee", True),
+    ],
+)
+def test_has_identifiers(query: str, expected: bool) -> None:
+    assert has_identifiers(query) is expected
+
+
+def test_generic_paraphrases_share_a_reply(ai: PylonAI) -> None:
+    _, first = ai.process_query("Where is my package?", "c1")
+    _, second = ai.process_query("Where's my parcel?", "c2")
+    assert second == first
+    assert ai.reply_cache.report()["hits"] == 1
+
+
+@pytest.mark.privacy_security
+def test_paraphrases_with_identifiers_do_not_share_a_reply(ai: PylonAI) -> None:
+    _, first = ai.process_query("My order #1234 hasn't arrived", "c1")
+    _, second = ai.process_query("My order #5678 hasn't arrived", "c2")
+    assert "#1234" not in second
+    assert "#5678" in second
+    assert ai.reply_cache.report()["entries"] == {}
+
+
+def test_ongoing_conversation_skips_cache(ai: PylonAI) -> None:
+    ai.process_query("Where is my package?", "c1")
+    _, reply = ai.process_query("Where's my parcel?", "c1")
+    assert reply == "Re: Where's my parcel?"
+    assert ai.reply_cache.report()["lookups"] == 1
+
+
+def test_preview_leaves_conversation_and_cache_untouched(ai: PylonAI) -> None:
+    ai.process_query("Where is my package?", "c1", remember=False)
+    assert ai.conversations.get("c1") is None
+    assert ai.reply_cache.report()["entries"] == {}
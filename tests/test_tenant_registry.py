@@ -0,0 +1,159 @@
+import json
+import os
+
+import pytest
+from ai_config.tenant_registry import TenantConfig, TenantRegistry
+
+
+@pytest.fixture
+def registry_path(tmp_path):
+    path = tmp_path / "tenants.json"
+    path.write_text(json.dumps({"tenants": {"bubbles": {}}}))
+    return path
+
+
+def test_tenants_load_lazily_with_their_settings(registry_path) -> None:
+    registry = TenantRegistry(str(registry_path))
+    assert registry.loaded_tenants == []
+    registry.register("acme", TenantConfig(model="acme-model", max_tokens=50))
+    ai = registry.get("acme")
+    assert ai.model == "acme-model"
+    assert ai.max_tokens == 50
+    assert registry.get("acme") is ai
+    assert registry.get("bubbles").model != "acme-model"
+    assert registry.loaded_tenants == ["acme", "bubbles"]
+
+
+def test_least_recently_used_tenant_is_unloaded(registry_path) -> None:
+    registry = TenantRegistry(str(registry_path), max_loaded=2)
+    for tenant_id in ("a", "b", "c"):
+        registry.register(tenant_id, TenantConfig())
+    first = registry.get("a")
+    registry.get("b")
+    registry.get("a")
+    registry.get("c")
+    assert registry.loaded_tenants == ["a", "c"]
+    assert registry.get("a") is first
+
+
+def test_registry_file_changes_are_picked_up(registry_path) -> None:
+    registry = TenantRegistry(str(registry_path))
+    with pytest.raises(KeyError):
+        registry.get("newco")
+    registry_path.write_text(
+        json.dumps({"tenants": {"bubbles": {}, "newco": {"temperature": 0.0}}})
+    )
+    mtime = os.path.getmtime(registry_path) + 1
+    os.utime(registry_path, (mtime, mtime))
+    assert registry.get("newco").temperature == 0.0
+
+
+def test_removed_tenants_are_dropped(registry_path) -> None:
+    registry = TenantRegistry(str(registry_path))
+    registry.register("runtime", TenantConfig())
+    registry.get("bubbles")
+    registry_path.write_text(json.dumps({"tenants": {}}))
+    mtime = os.path.getmtime(registry_path) + 1
+    os.utime(registry_path, (mtime, mtime))
+    with pytest.raises(KeyError):
+        registry.get("bubbles")
+    assert registry.loaded_tenants == []
+    assert registry.get("runtime") is not None
+
+
+def test_embedding_model_is_independent_of_chat_model(registry_path) -> None:
+    registry = TenantRegistry(str(registry_path))
+    registry.register("acme", TenantConfig(model="acme-chat"))
+    ai = registry.get("acme")
+    assert ai.model == "acme-chat"
+    assert ai.embedding_model == registry.get("bubbles").embedding_model
+
+
+def test_tenants_reply_through_their_own_workspace(
+    registry_path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    import intercom_integration.send_reply as sr
+
+    monkeypatch.setenv("ACME_INTERCOM_TOKEN", "acme-token")
+    registry_path.write_text(
+        json.dumps(
+            {
+                "tenants": {
+                    "acme": {
+                        "intercom_access_token": "${ACME_INTERCOM_TOKEN}",
+                        "intercom_admin_id": "42",
+                    }
+                }
+            }
+        )
+    )
+    ai = TenantRegistry(str(registry_path)).get("acme")
+    assert ai.intercom_client.personal_access_token == "acme-token"
+    assert ai.intercom_client.http_session is sr.intercom.http_session
+
+    calls = []
+    monkeypatch.setattr(
+        "ai_config.pylon_ai.send_reply",
+        lambda conversation_id, message, **kwargs: calls.append(kwargs) or True,
+    )
+    assert ai.deliver("conv_1", "Hello!")
+    assert calls == [{"client": ai.intercom_client, "reply_admin_id": "42"}]
+
+
+def write_registry(path, tenants: dict) -> None:
+    path.write_text(json.dumps({"tenants": tenants}))
+    mtime = os.path.getmtime(path) + 1
+    os.utime(path, (mtime, mtime))
+
+
+def test_invalid_entries_do_not_take_down_other_tenants(registry_path) -> None:
+    registry = TenantRegistry(str(registry_path))
+    bubbles = registry.get("bubbles")
+    write_registry(registry_path, {"bubbles": {"modle": "x"}, "acme": {"modle": "x"}})
+    assert registry.get("bubbles") is bubbles
+    with pytest.raises(KeyError):
+        registry.get("acme")
+    registry_path.write_text('{"tenants": {"bubbles": ')
+    assert registry.get("bubbles") is bubbles
+
+
+def test_credentials_are_validated_at_load(
+    registry_path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.delenv("MISSING_INTERCOM_TOKEN", raising=False)
+    registry = TenantRegistry(str(registry_path))
+    write_registry(
+        registry_path,
+        {
+            "unset": {
+                "intercom_access_token": "${MISSING_INTERCOM_TOKEN}",
+                "intercom_admin_id": "42",
+            },
+            "no_admin": {"intercom_access_token": "token"},
+        },
+    )
+    for tenant_id in ("unset", "no_admin"):
+        with pytest.raises(KeyError):
+            registry.get(tenant_id)
+    with pytest.raises(ValueError):
+        TenantConfig(intercom_admin_id="42")
+
+
+def test_tenants_share_embedding_indexes(tmp_path, registry_path) -> None:
+    index_path = tmp_path / "embeddings.json"
+    index_path.write_text(
+        json.dumps(
+            [
+                {"embedding": [1.0, 0.0], "intent": "refund_request", "query": "a"},
+                {"embedding": [0.0, 2.0], "intent": "bug_report", "query": "b"},
+            ]
+        )
+    )
+    registry = TenantRegistry(str(registry_path))
+    for tenant_id in ("a", "b"):
+        registry.register(tenant_id, TenantConfig(embedding_path=str(index_path)))
+    index = registry.get("a").embedding_index
+    assert registry.get("b").embedding_index is index
+    assert index.matrix.dtype.name == "float32"
+    assert index.nearest_intent([0.1, 0.9]) == "bug_report"
+    assert index.nearest_intent([0.0, 0.0]) == "general_inquiry"